@@ -1,12 +1,20 @@
 import logging
 import logging.handlers
-import pkg_resources
+import os
 import socket
 
+try:
+    from importlib.metadata import version as _version
+except ImportError:  # Python < 3.8
+    from pkg_resources import get_distribution
+
+    def _version(name):
+        return get_distribution(name).version
+
 
 class ContextFilter(logging.Filter):
     hostname = socket.gethostname()
-    version = pkg_resources.get_distribution('rpi_metar').version
+    version = _version('rpi_metar')
 
     def filter(self, record):
         record.hostname = ContextFilter.hostname
@@ -21,7 +29,10 @@ def init_logger():
 
     log = logging.getLogger(__name__)
 
-    log.setLevel(logging.DEBUG)
+    # Every record below the threshold still costs formatting plus a send to
+    # /dev/log, so default to INFO and let debugging be opted into via the
+    # environment (e.g. systemctl set-environment RPI_METAR_LOG=DEBUG).
+    log.setLevel(os.environ.get('RPI_METAR_LOG', 'INFO'))
     formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(version)s - %(threadName)s - %(message)s')
     handler = logging.handlers.SysLogHandler(address='/dev/log')
     handler.setFormatter(formatter)
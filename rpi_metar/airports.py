@@ -1,18 +1,30 @@
 import logging
 import re
-from queue import Queue
+from queue import SimpleQueue
 from rpi_metar import wx
 
 MAX_WIND_SPEED_KTS = 30  # When it's too windy, in knots.
 
+# Thunderstorms in the body of the report (not the RMK section); compiled once
+# rather than per METAR.
+_TS_RE = re.compile(r'\w{4,5}.*(TS).*?(?=RMK)', re.ASCII)
+
 log = logging.getLogger(__name__)
 
 
-LED_QUEUE = Queue()
+# SimpleQueue: C-level FIFO without Queue's Python-side mutex/condvar, which
+# is all this single-producer/single-consumer channel needs.
+LED_QUEUE = SimpleQueue()
 
 
 class Airport(object):
 
+    # Slots keep the per-instance footprint down and turn the attribute reads
+    # in the wind/lightning/render loops into fixed-offset loads.
+    __slots__ = ('code', 'index', 'visibility', 'ceiling', 'raw', 'thunderstorms',
+                 'wind_speed', 'wind_gusts', 'max_wind_speed', 'color',
+                 '_category', '_unknown_count', '_unknown_off')
+
     def __init__(self, code, led_index, max_wind_speed_kts=MAX_WIND_SPEED_KTS, unknown_off=True):
         self.code = code.upper()
         self.index = led_index
@@ -24,6 +36,9 @@ class Airport(object):
         self.wind_gusts = 0
         self.max_wind_speed = max_wind_speed_kts
         self._category = wx.FlightCategory.UNKNOWN
+        # The raw color is cached alongside the category so the render threads
+        # don't walk the Enum descriptor chain for every pixel update.
+        self.color = self._category.value
         self._unknown_count = 0
         self._unknown_off = unknown_off
 
@@ -69,8 +84,11 @@ class Airport(object):
         if self._category != cat:
             log.info('Changing {self} to {cat}'.format(self=self, cat=cat))
             self._category = cat
+            self.color = cat.value
             log.info('Setting category, putting {} onto queue.'.format(self.code))
-            LED_QUEUE.put(self.code)
+            # The renderer looks airports up by LED index; an int avoids the
+            # per-event string hash and upper() allocation on the other side.
+            LED_QUEUE.put(self.index)
 
     def process_metar(self, metars):
         # Make sure previous iterations are cleared out
@@ -79,43 +97,49 @@ class Airport(object):
         try:
             metar = metars[self.code[:4]]
             log.debug(metar)
-            self.raw = metar['raw_text']
+            raw = self.raw = metar['raw_text']
         except KeyError:
             log.exception('{} has no data.'.format(self.code))
             self.category = wx.FlightCategory.UNKNOWN
             return
 
         # Thunderstorms
-        self.thunderstorms = bool(re.search(r'\w{4,5}.*(TS).*?(?=RMK)', metar['raw_text']) and self.category != wx.FlightCategory.OFF)
+        self.thunderstorms = bool(_TS_RE.search(raw) and self.category != wx.FlightCategory.OFF)
 
-        # Wind info
-        try:
-            self.wind_speed = int(metar['wind_speed_kt'])
-        except KeyError:
-            pass
+        # Wind info; both fields are optional (gusts especially, in calm
+        # weather), so probe with .get rather than raising per airport.
+        wind_speed = metar.get('wind_speed_kt')
+        if wind_speed is not None:
+            self.wind_speed = int(wind_speed)
 
-        try:
-            self.wind_gusts = int(metar['wind_gust_kt'])
-        except KeyError:
-            pass
+        wind_gusts = metar.get('wind_gust_kt')
+        if wind_gusts is not None:
+            self.wind_gusts = int(wind_gusts)
 
         # Flight categories. First automatic, then manual parsing.
-        try:
-            if metar['flight_category'] is None:
-                log.error('flight category is missing: {}', metar)
-            self.category = wx.FlightCategory[metar['flight_category']]
-        except KeyError:
+        name = metar.get('flight_category')
+        if name is None and 'flight_category' in metar:
+            log.error('flight category is missing: {}', metar)
+        # Look the member up through __members__ so the common miss is a plain
+        # None instead of exception-driven control flow.
+        category = wx.FlightCategory.__members__.get(name) if name is not None else None
+        if category is not None:
+            self.category = category
+        else:
             log.info('%s does not have flight category field, falling back to raw text parsing.', self.code)
-            self.visibility, self.ceiling, self.wind_speed, self.wind_gusts = wx.get_conditions(metar['raw_text'])
+            self.visibility, self.ceiling, self.wind_speed, self.wind_gusts = wx.get_conditions(raw)
             self.category = wx.get_flight_category(self.visibility, self.ceiling)
 
 
 class Legend(object):
 
+    __slots__ = ('name', 'index', 'category', 'color')
+
     def __init__(self, name, index, category):
         self.name = name
         self.index = index
         self.category = category
+        self.color = category.value
 
     def __repr__(self):
         return '<LEGEND @ {index}: {name}>'.format(
@@ -1,13 +1,12 @@
 #!/usr/bin/env python
 import enum
 
-import requests
 import logging
 import logging.handlers
 import os
 import socket
 import signal
-import sys
+import subprocess
 import time
 import threading
 from configparser import ConfigParser
@@ -16,7 +15,7 @@ from rpi_metar import cron, sources, encoder
 from rpi_metar.airports import Airport, LED_QUEUE, MAX_WIND_SPEED_KTS, Legend
 from rpi_metar import wx
 from rpi_metar import leds as colors
-from queue import Queue
+from queue import Empty, SimpleQueue
 
 
 log = logging.getLogger(__name__)
@@ -25,23 +24,32 @@ log = logging.getLogger(__name__)
 METAR_REFRESH_RATE = 5 * 60  # How often METAR data should be fetched, in seconds
 WIND_DISPLAY_RATE = 5  # How often to show that it's windy, in seconds
 LIGHTNING_STRIKE_RATE = 5  # How regularly should lightning strike, in seconds
+FADE_STEP = 8  # Channel units per fade step; each step is a full strip refresh
+STALE_DATA_TTL = 30 * 60  # How long old METAR data may stand in for a failed fetch, in seconds
 
 FAILURE_THRESHOLD = 3  # How many times do we not get data before we reboot
 
-ENCODER_QUEUE = Queue()
-METAR_QUEUE = Queue()
-ENCODER_EVENT = threading.Event()
+# Both pipelines are single-producer/single-consumer, so the C-level
+# SimpleQueue suffices; it skips Queue's Python-side mutex and condvar on
+# every transfer (same reasoning as LED_QUEUE in airports.py).
+ENCODER_QUEUE = SimpleQueue()
+METAR_QUEUE = SimpleQueue()
 METAR_EVENT = threading.Event()
+# Set on SIGINT/SIGTERM so sleeping threads wake immediately instead of
+# finishing out their current sleep interval.
+SHUTDOWN_EVENT = threading.Event()
 
 # A collection of the airports we'll ultimately be tracking.
 AIRPORTS = {}
 
 
 def is_internet_up():
+    # A raw TCP connect to a public resolver answers the question in one
+    # round trip, with no DNS lookup and no HTTP exchange; the old GET to
+    # google.com could sit on a degraded link for its full 10s timeout.
     try:
-        response = requests.get('http://google.com', timeout=10.0)
-        response.raise_for_status()
-    except:  # noqa
+        socket.create_connection(('8.8.8.8', 53), timeout=2).close()
+    except OSError:
         return False
     return True
 
@@ -50,16 +58,36 @@ def fetch_metars(queue, cfg):
     """Fetches new METAR information periodically."""
     failure_count = 0
 
+    # Serve stale data during transient outages: rather than flipping the
+    # whole map to UNKNOWN the moment every source hiccups, reuse the last
+    # successful fetch until it's too old to trust.
+    stale_ttl = cfg.getint('settings', 'stale_data_ttl', fallback=STALE_DATA_TTL)
+    last_metars = None
+    last_fetched = 0
+
     # Load the desired data sources from the user configuration.
     srcs = cfg.get('settings', 'sources', fallback='NOAA,NOAABackup,SkyVector').split(',')
     srcs = [getattr(sources, src.strip()) for src in srcs]
 
+    # Remember which source last delivered so the next cycle starts there
+    # instead of re-waiting out the primary's timeouts while it's down.
+    last_good = 0
+
+    # getint walks the section proxy and re-parses the string on every call;
+    # the config doesn't change underneath us, so resolve it once.
+    refresh_rate = cfg.getint('settings', 'metar_refresh_rate', fallback=METAR_REFRESH_RATE)
+
+    # Allow duplicate LEDs by only using the first 4 chars as the ICAO. Anything else after it
+    # helps keep it unique. AIRPORTS doesn't change after load, so snapshot once.
+    all_codes = frozenset(code[:4] for code in AIRPORTS)
+
     while True:
 
         metars = {}
-        # Allow duplicate LEDs by only using the first 4 chars as the ICAO. Anything else after it helps keep it unique.
-        airport_codes = set([code[:4] for code in AIRPORTS.keys()])
-        for source in srcs:
+        airport_codes = set(all_codes)
+        for offset in range(len(srcs)):
+            position = (last_good + offset) % len(srcs)
+            source = srcs[position]
             try:
                 data_source = source(list(airport_codes), config=cfg)
             except:  # noqa
@@ -71,13 +99,15 @@ def fetch_metars(queue, cfg):
                 log.info('Retrieved: %s', info)
                 metars.update(info)
                 failure_count = 0
+                last_good = position
             except:  # noqa
                 log.exception('Failed to retrieve metar info.')
 
             # We have retrieved METAR info, but did we get responses for all stations? If we did
             # not, let's request those missing stations from the other sources. Perhaps they have
             # the info!
-            airport_codes = airport_codes - set(metars.keys())
+            # In-place difference against the keys view; no throwaway sets.
+            airport_codes.difference_update(metars.keys())
             if not airport_codes:
                 # Nothing else needs to be retrieved
                 break
@@ -96,16 +126,35 @@ def fetch_metars(queue, cfg):
             # don't need to reboot.
             if failure_count >= FAILURE_THRESHOLD and not is_internet_up():
                 log.warning('Internet is not up, rebooting.')
-                os.system('reboot')
+                # Get the warning out to syslog before the system goes down,
+                # and skip the shell fork os.system would do.
+                logging.shutdown()
+                subprocess.run(['reboot'], check=False)
+
+            # METARs are only issued hourly, so the previous batch stays
+            # useful for a good while after a failed refresh.
+            if last_metars is not None and time.monotonic() - last_fetched <= stale_ttl:
+                log.warning('All sources failed; reusing stale data.')
+                metars = last_metars
+        else:
+            last_metars = metars
+            last_fetched = time.monotonic()
 
         queue.put(metars)
-        time.sleep(cfg.getint('settings', 'metar_refresh_rate', fallback=METAR_REFRESH_RATE))
+        if SHUTDOWN_EVENT.wait(timeout=refresh_rate):
+            return
 
 
 def process_metars(queue, leds):
     """Converts METAR info info Flight Categories and updates the LEDs."""
 
-    airports = AIRPORTS.values()
+    # A tuple iterates as a flat pointer walk and can't see concurrent dict
+    # mutation, unlike the live values() view.
+    airports = tuple(AIRPORTS.values())
+
+    # AIRPORTS doesn't change after configuration load, so sort once for the
+    # per-refresh summary log instead of on every iteration.
+    airports_by_index = sorted(airports, key=lambda x: x.index)
 
     # When the system first starts up, waiting for all of the LEDs to fade into their correct
     # colors can take a very long time. To mitigate this, we'll just slam the colors into place
@@ -124,17 +173,21 @@ def process_metars(queue, leds):
             for airport in airports:
                 airport.process_metar(metars)
 
-                if first:
-                    leds.setPixelColor(airport.index, airport.category.value)
-
             if first:
                 first = False
-                leds.show()
+                # Apply the whole batch at once after the refresh, skipping
+                # pixels that already show the right color.
+                updates = [(airport.index, airport.color) for airport in airports
+                           if leds.getPixelColor(airport.index) != airport.color]
+                for index, color in updates:
+                    leds.setPixelColor(index, color)
+                if updates:
+                    leds.show()
 
             # Let the weather checkers know the info is refreshed
             METAR_EVENT.set()
 
-            log.info(sorted(AIRPORTS.values(), key=lambda x: x.index))
+            log.info(airports_by_index)
 
         except:  # noqa
             log.exception('metar processor error')
@@ -142,57 +195,105 @@ def process_metars(queue, leds):
 
 def render_leds(queue, leds, cfg):
     """Updates the LED strand when something pops onto the queue."""
+
+    # Direct index -> Airport table; the queue carries LED indexes.
+    airports_by_index = [None] * (max(airport.index for airport in AIRPORTS.values()) + 1)
+    for airport in AIRPORTS.values():
+        airports_by_index[airport.index] = airport
+
+    # Resolved once; getboolean re-parses the string on every call.
+    do_fade = cfg.getboolean('settings', 'do_fade', fallback=True)
+
     while True:
         log.info('waiting for queue.')
-        airport_code = queue.get()
-        log.info('got {}'.format(airport_code))
-        airport = AIRPORTS[airport_code.upper()]
-        # This is our target color.
-        color = airport.category.value
-
-        if not cfg.getboolean('settings', 'do_fade', fallback=True):
-            leds.setPixelColor(airport.index, color)
-            leds.show()
+        indexes = {queue.get()}
+        # A METAR refresh can queue many airports at once; drain them all so
+        # their updates run together instead of one full fade after another.
+        try:
+            while True:
+                indexes.add(queue.get_nowait())
+        except Empty:
+            pass
+        log.info('got {}'.format(indexes))
+        airports = [airports_by_index[index] for index in indexes]
+
+        if not do_fade:
+            # Pushing an unchanged pixel still costs a call into the C
+            # extension and a DMA refresh, so only write deltas.
+            changed = False
+            for airport in airports:
+                if leds.getPixelColor(airport.index) != airport.color:
+                    leds.setPixelColor(airport.index, airport.color)
+                    changed = True
+            if changed:
+                leds.show()
             continue
 
-        # Let's try to fade to our desired color
-        start_color = leds.getPixelColor(airport.index)
-        start_g = start_color >> 16 & 0xff
-        start_r = start_color >> 8 & 0xff
-        start_b = start_color & 0xff
+        # Work out each airport's fade: current and target channels, kept as
+        # mutable [index, r, g, b, end_r, end_g, end_b] records.
+        fades = []
+        steps = 0
+        for airport in airports:
+            start_color = leds.getPixelColor(airport.index)
+            start_g = start_color >> 16 & 0xff
+            start_r = start_color >> 8 & 0xff
+            start_b = start_color & 0xff
+
+            color = airport.color
+            end_g = color >> 16 & 0xff
+            end_r = color >> 8 & 0xff
+            end_b = color & 0xff
+
+            # The slowest channel dictates how many steps the fade takes; each
+            # channel moves up to FADE_STEP units per step (clamped), so a
+            # worst-case fade is ~32 strip refreshes instead of 255.
+            delta = max(abs(end_r - start_r), abs(end_g - start_g), abs(end_b - start_b))
+            if not delta:
+                continue
+            steps = max(steps, -(-delta // FADE_STEP))
+            fades.append([airport.index, start_r, start_g, start_b, end_r, end_g, end_b])
+
+        if not fades:
+            continue
 
-        end_g = color >> 16 & 0xff
-        end_r = color >> 8 & 0xff
-        end_b = color & 0xff
+        # Bind the per-step calls to locals; the fade loop runs dozens of
+        # iterations and each LOAD_ATTR costs real time on the Pi's ARM.
+        set_pixel = leds.setPixelColor
+        show = leds.show
 
         with leds.lock:  # Don't let lightning or wind interrupt us.
-            while((start_r != end_r) or (start_g != end_g) or (start_b != end_b)):
-                if start_r < end_r:
-                    start_r += 1
-                elif start_r > end_r:
-                    start_r -= 1
-                if start_g < end_g:
-                    start_g += 1
-                elif start_g > end_g:
-                    start_g -= 1
-                if start_b < end_b:
-                    start_b += 1
-                elif start_b > end_b:
-                    start_b -= 1
-
-                leds.setPixelColorRGB(airport.index, start_g, start_r, start_b)
-                leds.show()
+            for _ in range(steps):
+                # Advance every pending airport one step, then refresh the
+                # strip once: max(steps) shows instead of sum(steps).
+                for fade in fades:
+                    index, r, g, b, end_r, end_g, end_b = fade
+                    r += max(-FADE_STEP, min(FADE_STEP, end_r - r))
+                    g += max(-FADE_STEP, min(FADE_STEP, end_g - g))
+                    b += max(-FADE_STEP, min(FADE_STEP, end_b - b))
+                    fade[1] = r
+                    fade[2] = g
+                    fade[3] = b
+
+                    # Pack GRB ourselves and hit the single-argument entry
+                    # point; setPixelColorRGB would just rebuild this word.
+                    set_pixel(index, (g << 16) | (r << 8) | b)
+                show()
 
 
 def lightning(leds, event, cfg):
     """Briefly changes LEDs to white, indicating lightning in the area."""
-    airports = AIRPORTS.values()
+    airports = tuple(AIRPORTS.values())
     strike_duration = cfg.getfloat('settings', 'lightning_duration', fallback=1.0)
+    # Resolved once; getint re-parses the string on every call.
+    pause = LIGHTNING_STRIKE_RATE - strike_duration
+    refresh_rate = cfg.getint('settings', 'metar_refresh_rate', fallback=METAR_REFRESH_RATE)
     legend = cfg.getint('legend', 'lightning', fallback=None)
     legend = [Legend('LIGHTNING', legend, wx.FlightCategory.OFF)] if legend is not None else []
     while True:
-        # Which airports currently are experiencing thunderstorms
-        ts_airports = [airport for airport in airports if airport.thunderstorms] + legend
+        # Which airports currently are experiencing thunderstorms.  OFF pixels
+        # are dark on purpose; don't flash white over them.
+        ts_airports = [airport for airport in airports
+                       if airport.thunderstorms and airport.category is not wx.FlightCategory.OFF] + legend
         log.debug("LIGHTNING @: {}".format(ts_airports))
         if ts_airports:
             with leds.lock:
@@ -202,19 +303,21 @@ def lightning(leds, event, cfg):
                 time.sleep(strike_duration)
 
                 for airport in ts_airports:
-                    leds.setPixelColor(airport.index, airport.category.value)
+                    leds.setPixelColor(airport.index, airport.color)
                 leds.show()
-            time.sleep(LIGHTNING_STRIKE_RATE - strike_duration)
+            time.sleep(pause)
         else:
             # Sleep until the next metar refresh...
-            event.wait(cfg.getint('settings', 'metar_refresh_rate', fallback=METAR_REFRESH_RATE))
+            event.wait(refresh_rate)
             event.clear()
 
 
 def wind(leds, event, cfg):
     """Briefly changes LEDs to yellow, indicating it's too windy."""
-    airports = AIRPORTS.values()
+    airports = tuple(AIRPORTS.values())
     indicator_duration = cfg.getfloat('settings', 'wind_duration', fallback=1.0)
+    pause = WIND_DISPLAY_RATE - indicator_duration
+    refresh_rate = cfg.getint('settings', 'metar_refresh_rate', fallback=METAR_REFRESH_RATE)
     legend = cfg.getint('legend', 'wind', fallback=None)
     legend = [Legend('WIND', legend, wx.FlightCategory.OFF)] if legend is not None else []
     while True:
@@ -230,19 +333,20 @@ def wind(leds, event, cfg):
                 time.sleep(indicator_duration)
 
                 for airport in windy_airports:
-                    leds.setPixelColor(airport.index, airport.category.value)
+                    leds.setPixelColor(airport.index, airport.color)
                 leds.show()
 
-            time.sleep(WIND_DISPLAY_RATE - indicator_duration)
+            time.sleep(pause)
         else:
-            event.wait(cfg.getint('settings', 'metar_refresh_rate', fallback=METAR_REFRESH_RATE))
+            event.wait(refresh_rate)
             event.clear()
 
 
 def set_all(leds, color=colors.BLACK):
     """Sets all leds to a specific color."""
-    for i in range(leds.numPixels()):
-        leds.setPixelColor(i, color)
+    # One bulk slice assignment into the underlying buffer instead of a
+    # Python -> C call per pixel.
+    leds._led_data[:] = [color] * leds.numPixels()
     leds.show()
 
 
@@ -254,7 +358,7 @@ def load_configuration():
 
     if 'megamap' in socket.gethostname():
         cfg.set('settings', 'unknown_off', 'False')
-        cfg.write(open('/etc/rpi_metar.conf', 'w'))
+        save_config(cfg)
 
 
     # If we have redefined a color value (e.g. tweaked green a bit), or changed what should be displayed entirely (e.g.
@@ -315,39 +419,72 @@ def on_turn(delta):
     """Let the brightness adjustment thread be aware that it needs to do something."""
     log.debug("on turn called.")
     ENCODER_QUEUE.put(delta)
-    ENCODER_EVENT.set()
 
 
-def adjust_brightness(leds, cfg):
-    while not ENCODER_QUEUE.empty():
-        delta = ENCODER_QUEUE.get() * 5
-        brightness = leds.getBrightness()
-        try:
-            leds.setBrightness(brightness + delta)
-        except OverflowError:
-            log.info('New brightness exceeds limits: {}'.format(brightness + delta))
-        else:
-            leds.show()
-            log.info('Set brightness to {}'.format(brightness + delta))
+def save_config(cfg, path='/etc/rpi_metar.conf'):
+    """Writes the config out via a temp file and atomic rename.
+
+    A crash or power loss mid-write then leaves the old file intact instead
+    of a truncated one.
+    """
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        cfg.write(f)
+    os.replace(tmp, path)
+
 
-    # Now that we've handled everything in the queue, write out the current brightness into the
-    # config file. This way it persists upon reboots / restarts, etc.
+def save_brightness(leds, cfg):
+    """Writes the current brightness into the config file.
+
+    This way it persists upon reboots / restarts, etc.
+    """
     if 'settings' not in cfg:
         cfg['settings'] = {}
-    cfg['settings']['brightness'] = str(leds.getBrightness())
-    with open('/etc/rpi_metar.conf', 'w') as f:
-        cfg.write(f)
-    log.info('Saved new brightness ({}) to cfg file.'.format(leds.getBrightness()))
+    brightness = str(leds.getBrightness())
+    # A spin that lands back where it started doesn't need an SD-card write.
+    if cfg['settings'].get('brightness') == brightness:
+        return
+    cfg['settings']['brightness'] = brightness
+    save_config(cfg)
+    log.info('Saved new brightness ({}) to cfg file.'.format(brightness))
+
 
-    # Indicate that we've handled the event.
-    ENCODER_EVENT.clear()
+# Pending save_brightness timer; replaced each time the knob turns so the
+# config file is written once per spin, not once per detent.
+_persist_timer = None
 
 
-def wait_for_knob(event, leds, cfg):
+def adjust_brightness(leds, cfg, delta):
+    # A fast spin delivers a burst of events; sum whatever has accumulated and
+    # apply it as a single brightness write and strip refresh.
     while True:
         try:
-            event.wait()
-            adjust_brightness(leds, cfg)
+            delta += ENCODER_QUEUE.get_nowait()
+        except Empty:
+            break
+
+    brightness = max(0, min(255, leds.getBrightness() + delta * 5))
+    leds.setBrightness(brightness)
+    leds.show()
+    log.info('Set brightness to {}'.format(brightness))
+
+    # Defer persisting until the knob has been idle for a few seconds; each
+    # write costs an SD-card sync and spins produce dozens of events.
+    global _persist_timer
+    if _persist_timer is not None:
+        _persist_timer.cancel()
+    _persist_timer = threading.Timer(5.0, save_brightness, args=(leds, cfg))
+    _persist_timer.daemon = True
+    _persist_timer.start()
+
+
+def wait_for_knob(leds, cfg):
+    while True:
+        try:
+            # Block on the queue itself; a separate wake-up Event was just
+            # duplicating the condition variable the queue already has.
+            delta = ENCODER_QUEUE.get()
+            adjust_brightness(leds, cfg, delta)
         except:
             log.exception('unexpected error')
 
@@ -383,9 +520,9 @@ def main():
     knob = encoder.RotaryEncoder(callback=on_turn)
 
     def on_exit(sig, frame):
-        knob.destroy()
-        set_all(leds, colors.BLACK)
-        sys.exit(0)
+        # Just flag it; the actual teardown (SPI writes and GPIO cleanup)
+        # isn't async-signal-safe, so it runs in the main thread below.
+        SHUTDOWN_EVENT.set()
 
     signal.signal(signal.SIGINT, on_exit)
     signal.signal(signal.SIGTERM, on_exit)
@@ -397,7 +534,7 @@ def main():
     kwargs = {
         'num': get_num_leds(cfg),
         'pin': 18,
-        'gamma': colors.GAMMA,
+        'gamma': list(colors.GAMMA),  # the ws281x binding only accepts a list
         'brightness': int(cfg.get('settings', 'brightness', fallback=128))
     }
     # Sometimes if we use LED strips from different batches, they behave differently with the gamma
@@ -408,39 +545,44 @@ def main():
     leds = PixelStrip(**kwargs)
     leds.begin()
     leds.lock = threading.Lock()
+    # set_all's bulk write already paints every pixel (airports included)
+    # UNKNOWN; only the legend needs individual touches afterwards.
     set_all(leds, wx.FlightCategory.UNKNOWN.value)
-
-    for airport in AIRPORTS.values():
-        leds.setPixelColor(airport.index, wx.FlightCategory.UNKNOWN.value)
     set_legend(leds, cfg)
     leds.show()
 
     # Kick off a thread to handle adjusting the brightness
-    t = threading.Thread(name='brightness', target=wait_for_knob, args=(ENCODER_EVENT, leds, cfg))
+    t = threading.Thread(name='brightness', target=wait_for_knob, args=(leds, cfg), daemon=True)
     t.start()
 
     # A thread to fetch metar information periodically
-    t = threading.Thread(name='metar_fetcher', target=fetch_metars, args=(METAR_QUEUE, cfg))
+    t = threading.Thread(name='metar_fetcher', target=fetch_metars, args=(METAR_QUEUE, cfg), daemon=True)
     t.start()
 
     # A thread to process metar info.
-    t = threading.Thread(name='metar_processor', target=process_metars, args=(METAR_QUEUE, leds))
+    t = threading.Thread(name='metar_processor', target=process_metars, args=(METAR_QUEUE, leds), daemon=True)
     t.start()
 
     # A thread to change the LEDs when airport categories change.
-    t = threading.Thread(name='render_leds', target=render_leds, args=(LED_QUEUE, leds, cfg))
+    t = threading.Thread(name='render_leds', target=render_leds, args=(LED_QUEUE, leds, cfg), daemon=True)
     t.start()
 
     # A thread for lightning
     if cfg.get('settings', 'lightning', fallback=True):
-        t = threading.Thread(name='lightning', target=lightning, args=(leds, METAR_EVENT, cfg))
+        t = threading.Thread(name='lightning', target=lightning, args=(leds, METAR_EVENT, cfg), daemon=True)
         t.start()
 
     # A thread for wind
     if cfg.get('settings', 'wind', fallback=True):
-        t = threading.Thread(name='wind', target=wind, args=(leds, METAR_EVENT, cfg))
+        t = threading.Thread(name='wind', target=wind, args=(leds, METAR_EVENT, cfg), daemon=True)
         t.start()
 
+    # The workers are all daemon threads, so the main thread parks here until
+    # a signal arrives and then handles the cleanup itself.
+    SHUTDOWN_EVENT.wait()
+    knob.destroy()
+    set_all(leds, colors.BLACK)
+
 
 if __name__ == '__main__':
     main()
@@ -16,12 +16,14 @@ def set_upgrade_schedule():
     daily_found = False
     reboot_found = False
 
-    # Search for daily and reboot checks, removing anything else
+    # Search for daily and reboot checks, removing anything else. Compare the
+    # schedule text directly rather than computing job.frequency(), which
+    # multiplies out every slice just to recover these two constants.
     for job in cron.find_command(cmd):
-        freq = job.frequency()
-        if freq == 365:
+        slices = str(job.slices)
+        if slices in ('@daily', '0 0 * * *'):
             daily_found = True
-        elif freq == 525600:
+        elif slices == '@reboot':
             reboot_found = True
         else:
             cron.remove(job)
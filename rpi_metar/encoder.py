@@ -24,8 +24,11 @@ class RotaryEncoder:
         GPIO.setup(self.gpio_a, GPIO.IN, pull_up_down=GPIO.PUD_UP)
         GPIO.setup(self.gpio_b, GPIO.IN, pull_up_down=GPIO.PUD_UP)
 
-        GPIO.add_event_detect(self.gpio_a, GPIO.BOTH, self._callback)
-        GPIO.add_event_detect(self.gpio_b, GPIO.BOTH, self._callback)
+        # Let the kernel swallow contact chatter; a mechanical encoder can
+        # bounce dozens of edges per detent and each one otherwise runs this
+        # Python callback.
+        GPIO.add_event_detect(self.gpio_a, GPIO.BOTH, self._callback, bouncetime=2)
+        GPIO.add_event_detect(self.gpio_b, GPIO.BOTH, self._callback, bouncetime=2)
 
     def destroy(self):
         GPIO.remove_event_detect(self.gpio_a)
@@ -1,6 +1,6 @@
 #!/usr/bin/env python
 from rpi_metar import sources, core
-from rpi_metar.leds import GREEN, BLACK
+from rpi_metar.leds import GREEN, BLACK, GAMMA
 from rpi_ws281x import PixelStrip
 import configparser
 
@@ -10,7 +10,7 @@ def main():
     config['settings'] = {'brightness': 75}
     cfg_file = '/etc/rpi_metar.conf'
 
-    leds = PixelStrip(num=2000, pin=18, gamma=core.GAMMA, brightness=128)
+    leds = PixelStrip(num=2000, pin=18, gamma=list(GAMMA), brightness=128)
     leds.begin()
 
     # If there's an existing config file, see if we want to continue where we left off or just
@@ -3,13 +3,58 @@ import logging
 import re
 import requests
 import time
+import xml.etree.ElementTree as ET
 
 from pkg_resources import resource_filename
+from requests.adapters import HTTPAdapter
 from retrying import retry
-from xmltodict import parse as parsexml
 
 log = logging.getLogger(__name__)
 
+# A single keep-alive session shared by every source, so each refresh reuses
+# the previous TCP/TLS connection instead of handshaking from scratch.
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+_session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+# The METAR XML is highly repetitive, so ask for it compressed. urllib3
+# inflates it incrementally as the streaming parser reads.
+_session.headers['Accept-Encoding'] = 'gzip'
+
+# The BOM and IFIS pages are scanned in a single linear pass; compile the
+# patterns once instead of on every refresh.
+_BOM_METAR_RE = re.compile(r'(?:METAR |SPECI )(?P<METAR>(?P<CODE>\w{4}).*?)(?:<br />|<h3>)')
+_IFIS_METAR_RE = re.compile(r'(?:METAR |SPECI )(?P<METAR>(?P<CODE>\w{4}).*?)(?:<br/>|<h3>|=</span>|<br />)')
+
+# Conditional GET state: url -> (ETag, parsed result). When the server answers
+# 304 Not Modified we can reuse the previous parse without touching a body.
+_conditional_cache = {}
+
+# Parsed us-airports.csv, loaded on first use. SkyVector is re-instantiated
+# every refresh it's needed, and the CSV has ~70k rows; one read per process
+# beats one full scan per instance.
+_coordinates = None
+
+
+def _load_coordinates():
+    global _coordinates
+    if _coordinates is None:
+        file_name = resource_filename('rpi_metar', 'data/us-airports.csv')
+        with open(file_name, newline='') as csvfile:
+            _coordinates = {code: (lat, lon) for code, lat, lon in csv.reader(csvfile)}
+    return _coordinates
+
+
+# The only per-station fields the rest of the program reads; the NOAA
+# response carries ~30 per METAR and the rest would just be dead weight in
+# every dict for every refresh.
+_NOAA_FIELDS = frozenset((
+    'station_id',
+    'raw_text',
+    'flight_category',
+    'wind_speed_kt',
+    'wind_gust_kt',
+))
+
 
 def chunks(l, n):
     """Yield successive n-sized chunks from l."""
@@ -19,14 +64,26 @@ def chunks(l, n):
 
 class METARSource:
 
+    # Sources are rebuilt every refresh cycle they're consulted; slots keep
+    # that churn dict-free (matching Airport and Legend in airports.py).
+    __slots__ = ('airport_codes', 'url')
+
     @retry(wait_exponential_multiplier=1000,
            wait_exponential_max=10000,
            stop_max_attempt_number=10)
     def _query(self):
         """Queries the NOAA METAR service."""
         log.info(self.url)
+        headers = {}
+        cached = _conditional_cache.get(self.url)
+        if cached:
+            headers['If-None-Match'] = cached[0]
         try:
-            response = requests.get(self.url, timeout=10.0)
+            # Stream so consumers can parse the body as it arrives instead of
+            # buffering the whole thing first.
+            # Split connect/read timeouts: fail fast on a dead link without
+            # cutting short a slow-but-alive body read.
+            response = _session.get(self.url, timeout=(3.05, 10.0), stream=True, headers=headers)
             response.raise_for_status()
         except:  # noqa
             log.exception('Metar query failure.')
@@ -36,6 +93,8 @@ class METARSource:
 
 class NOAA(METARSource):
 
+    __slots__ = ('subdomain',)
+
     URL = (
         'https://{subdomain}.aviationweather.gov/cgi-bin/data/dataserver.php'
         '?dataSource=metars'
@@ -47,7 +106,9 @@ class NOAA(METARSource):
     )
 
     def __init__(self, airport_codes, subdomain='www', **kwargs):
-        self.airport_codes = airport_codes
+        # Sorted so the generated URLs are stable across refreshes, which keeps
+        # the conditional GET cache effective.
+        self.airport_codes = sorted(airport_codes)
         self.subdomain = subdomain
 
     def get_metar_info(self):
@@ -57,34 +118,58 @@ class NOAA(METARSource):
         # NOAA can only handle so much at once, so split into chunks.
         # Even though we can issue larger chunk sizes, sometimes data is missing from the returned
         # results. Smaller chunks seem to help...
+        first = True
         for chunk in chunks(self.airport_codes, 250):
+            # With more requests, we should be nice and pause between consecutive
+            # ones -- but only between them; most maps fit in a single chunk and
+            # shouldn't pay a flat sleep per refresh.
+            if not first:
+                time.sleep(1.0)
+            first = False
+
             self.url = self.URL.format(airport_codes=','.join(chunk), subdomain=self.subdomain)
             response = self._query()
+
+            # Upstream hasn't changed since last refresh; reuse the previous parse.
+            if response.status_code == 304:
+                metars.update(_conditional_cache[self.url][1])
+                continue
+
+            parsed = {}
             try:
-                response = parsexml(response.text)['response']['data']['METAR']
-                if not isinstance(response, list):
-                    response = [response]
+                # Stream through the document rather than building a full dict tree for
+                # every METAR; elements are flattened and discarded as soon as they end.
+                response.raw.decode_content = True
+                for _, elem in ET.iterparse(response.raw):
+                    if elem.tag == 'METAR':
+                        metar = {child.tag: child.text for child in elem
+                                 if child.tag in _NOAA_FIELDS}
+                        parsed[metar['station_id'].upper()] = metar
+                        elem.clear()
             except:  # noqa
                 log.exception('Metar response is invalid.')
                 raise
-            finally:
-                # ...but with more requests, we should be nice and wait a bit before the next
-                time.sleep(1.0)
 
-            for m in response:
-                metars[m['station_id'].upper()] = m
+            etag = response.headers.get('ETag')
+            if etag:
+                _conditional_cache[self.url] = (etag, parsed)
+            metars.update(parsed)
 
         return metars
 
 
 class NOAABackup(NOAA):
 
+    __slots__ = ()
+
     def __init__(self, airport_codes, **kwargs):
         super(NOAABackup, self).__init__(airport_codes, subdomain='bcaws', **kwargs)
 
 
 class SkyVector(METARSource):
 
+    __slots__ = ('data',)
+
     URL = (
         'https://skyvector.com/api/dLayer'
         '?ll1={lat1},{lon1}'  # lower left
@@ -93,32 +178,28 @@ class SkyVector(METARSource):
     )
 
     def _find_coordinates(self):
-        data = {}
-        file_name = resource_filename('rpi_metar', 'data/us-airports.csv')
-        with open(file_name, newline='') as csvfile:
-            reader = csv.reader(csvfile)
-            for row in reader:
-                airport_code, lat, lon = row
-                if airport_code in self.airport_codes:
-                    data[airport_code] = (lat, lon)
+        coordinates = _load_coordinates()
+        data = {code: coordinates[code] for code in self.airport_codes if code in coordinates}
 
         self.data = data
 
-        lat1 = min((float(lat) for lat, _ in data.values()))
-        lon1 = min((float(lon) for _, lon in data.values()))
-        lat2 = max((float(lat) for lat, _ in data.values()))
-        lon2 = max((float(lon) for _, lon in data.values()))
+        lats = [float(lat) for lat, _ in data.values()]
+        lons = [float(lon) for _, lon in data.values()]
 
         # skyvector either isn't inclusive, or our data doesn't match theirs. Regardless, we
         # must expand the search area slightly.
-        lat1, lon1 = map(lambda x: x - 0.5, [lat1, lon1])
-        lat2, lon2 = map(lambda x: x + 0.5, [lat2, lon2])
+        lat1 = min(lats) - 0.5
+        lon1 = min(lons) - 0.5
+        lat2 = max(lats) + 0.5
+        lon2 = max(lons) + 0.5
 
         self.url = SkyVector.URL.format(lat1=lat1, lon1=lon1, lat2=lat2, lon2=lon2)
 
     def __init__(self, airport_codes, **kwargs):
+        # A frozenset: get_metar_info membership-tests every station in the
+        # response against this, and a list would make that O(n) per item.
+        self.airport_codes = frozenset(code.upper() for code in airport_codes)
         # Set lat / long info for the request...
-        self.airport_codes = [code.upper() for code in airport_codes]
         self._find_coordinates()
 
     def get_metar_info(self):
@@ -142,17 +223,16 @@ class SkyVector(METARSource):
         """
 
         # Make the return match the format of the other sources.
-        metars = {}
-        for item in data:
-            if item['s'] in self.airport_codes:
-                metars[item['s'].upper()] = {'raw_text': item['m']}
-
-        return metars
+        codes = self.airport_codes
+        return {item['s'].upper(): {'raw_text': item['m']}
+                for item in data if item['s'] in codes}
 
 
 class BOM(METARSource):
     """Queries the BOM website service."""
 
+    __slots__ = ()
+
     URL = 'http://www.bom.gov.au/aviation/php/process.php'
 
     def __init__(self, airport_codes, **kwargs):
@@ -166,9 +246,9 @@ class BOM(METARSource):
             'page': 'TAF',
         }
 
-        r = requests.post(self.URL, data=payload)
+        r = _session.post(self.URL, data=payload)
 
-        matches = re.finditer(r'(?:METAR |SPECI )(?P<METAR>(?P<CODE>\w{4}).*?)(?:<br />|<h3>)', r.text)
+        matches = _BOM_METAR_RE.finditer(r.text)
 
         metars = {}
         for match in matches:
@@ -179,6 +259,9 @@ class BOM(METARSource):
 
 
 class IFIS(METARSource):
+
+    __slots__ = ('username', 'password', 'login_payload', 'data_payload')
+
     URL = 'https://www.ifis.airways.co.nz/script/briefing/met_briefing_proc.asp'
     LOGIN_URL = 'https://www.ifis.airways.co.nz/secure/script/user_reg/login_proc.asp'
 
@@ -207,7 +290,7 @@ class IFIS(METARSource):
             r = session.post(self.URL, data=self.data_payload)
             log.info(r.text)
 
-        matches = re.finditer(r'(?:METAR |SPECI )(?P<METAR>(?P<CODE>\w{4}).*?)(?:<br/>|<h3>|=</span>|<br />)', r.text)
+        matches = _IFIS_METAR_RE.finditer(r.text)
 
         metars = {}
 
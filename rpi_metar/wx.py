@@ -1,12 +1,20 @@
 """Weather parsing utilities."""
+import functools
 import logging
 import re
 from enum import Enum
-from fractions import Fraction
 from rpi_metar.leds import GREEN, RED, BLUE, MAGENTA, YELLOW, BLACK, ORANGE, WHITE
 
 log = logging.getLogger(__name__)
 
+# Compiled once at import so the hot parsing loop doesn't pay the re module's
+# pattern-cache lookup for every airport on every refresh.
+_METRIC_VIS_RE = re.compile(r'(?P<CAVOK>CAVOK)|(\s(?P<visibility>\d{4}|\/{4})\s)', re.ASCII)
+# Statute-mile visibility and ceiling share one alternation so the engine
+# scans the report once instead of twice; the branches can't overlap.
+_VIS_CEIL_RE = re.compile(r'(?P<visibility>\b(?:\d+\s+)?\d+(?:/\d)?)SM|(?:VV|BKN|OVC)(?P<ceiling>\d{3})', re.ASCII)
+_WIND_RE = re.compile(r'\b\d{3}(?P<speed>\d{2,3})G?(?P<gust>\d{2,3})?KT', re.ASCII)
+
 
 class FlightCategory(Enum):
     VFR = GREEN
@@ -20,15 +28,39 @@ class FlightCategory(Enum):
     WINDY = YELLOW
 
 
+@functools.lru_cache(maxsize=128)
+def _parse_visibility(token):
+    """Converts a statute-mile visibility token (e.g. '1 1/2') into a float.
+
+    METARs draw these from a tiny vocabulary, so the cache saturates within
+    one refresh.  The values are always whole numbers and/or single-digit
+    fractions, so plain integer division beats Fraction's parse-and-gcd path.
+    """
+    try:
+        visibility = 0.0
+        for part in token.split():
+            num, _, den = part.partition('/')
+            visibility += int(num) / int(den) if den else int(num)
+        return visibility
+    except ZeroDivisionError:
+        return None
+
+
+@functools.lru_cache(maxsize=512)
 def get_conditions(metar_info):
-    """Returns the visibility, ceiling, wind speed, and gusts for a given airport from some metar info."""
+    """Returns the visibility, ceiling, wind speed, and gusts for a given airport from some metar info.
+
+    METARs are issued hourly but we poll every five minutes, so most refreshes
+    hand us raw text we have already parsed; the cache skips the regex work
+    for those repeats.
+    """
     log.debug(metar_info)
     visibility = ceiling = None
     speed = gust = 0
     # Visibility
 
     # Match metric visibility and convert to SM
-    match = re.search(r'(?P<CAVOK>CAVOK)|(\s(?P<visibility>\d{4}|\/{4})\s)', metar_info)
+    match = _METRIC_VIS_RE.search(metar_info)
     if match:
         if match.group('visibility'):
             try:
@@ -38,29 +70,43 @@ def get_conditions(metar_info):
         if match.group('CAVOK'):
             visibility = 10
 
-    # Match SM Visibility
-    # We may have fractions, e.g. 1/8SM or 1 1/2SM
+    # Match SM Visibility and ceiling in one left-to-right pass; the first hit
+    # for each wins, same as the old independent searches.
+    # Visibility may have fractions, e.g. 1/8SM or 1 1/2SM
     # Or it will be whole numbers, e.g. 2SM
     # There's also variable wind speeds, followed by vis, e.g. 300V360 1/2SM
-    match = re.search(r'(?P<visibility>\b(?:\d+\s+)?\d+(?:/\d)?)SM', metar_info)
-    if match:
-        visibility = match.group('visibility')
-        try:
-            visibility = float(sum(Fraction(s) for s in visibility.split()))
-        except ZeroDivisionError:
-            visibility = None
-    # Ceiling
-    match = re.search(r'(VV|BKN|OVC)(?P<ceiling>\d{3})', metar_info)
-    if match:
-        ceiling = int(match.group('ceiling')) * 100  # It is reported in hundreds of feet
+    found_vis = False
+    for match in _VIS_CEIL_RE.finditer(metar_info):
+        if match.lastgroup == 'ceiling':
+            if ceiling is None:
+                ceiling = int(match.group('ceiling')) * 100  # It is reported in hundreds of feet
+        elif not found_vis:
+            found_vis = True
+            visibility = _parse_visibility(match.group('visibility'))
+        if found_vis and ceiling is not None:
+            break
     # Wind info
-    match = re.search(r'\b\d{3}(?P<speed>\d{2,3})G?(?P<gust>\d{2,3})?KT', metar_info)
+    match = _WIND_RE.search(metar_info)
     if match:
         speed = int(match.group('speed'))
         gust = int(match.group('gust')) if match.group('gust') else 0
     return (visibility, ceiling, speed, gust)
 
 
+# The FAA thresholds quantize both axes into four buckets; the worse (lower)
+# bucket of the two decides the category.
+# http://www.faraim.org/aim/aim-4-03-14-446.html
+_CATEGORY_NAMES = ('LIFR', 'IFR', 'MVFR', 'VFR')
+
+
+def _vis_bucket(visibility):
+    return 0 if visibility < 1 else 1 if visibility < 3 else 2 if visibility <= 5 else 3
+
+
+def _ceiling_bucket(ceiling):
+    return 0 if ceiling < 500 else 1 if ceiling < 1000 else 2 if ceiling <= 3000 else 3
+
+
 def get_flight_category(visibility, ceiling):
     """Converts weather conditions into a category."""
     log.debug('Finding category for %s, %s', visibility, ceiling)
@@ -71,16 +117,11 @@ def get_flight_category(visibility, ceiling):
     if visibility and ceiling is None:
         ceiling = 10000
 
-    # http://www.faraim.org/aim/aim-4-03-14-446.html
     try:
-        if visibility < 1 or ceiling < 500:
-            return FlightCategory.LIFR
-        elif 1 <= visibility < 3 or 500 <= ceiling < 1000:
-            return FlightCategory.IFR
-        elif 3 <= visibility <= 5 or 1000 <= ceiling <= 3000:
-            return FlightCategory.MVFR
-        elif visibility > 5 and ceiling > 3000:
-            return FlightCategory.VFR
+        bucket = _vis_bucket(visibility)
+        if bucket:
+            bucket = min(bucket, _ceiling_bucket(ceiling))
+        return FlightCategory[_CATEGORY_NAMES[bucket]]
     except (TypeError, ValueError):
         log.exception('Failed to get flight category from {vis}, {ceil}'.format(
             vis=visibility,